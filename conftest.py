@@ -0,0 +1,257 @@
+"""
+Shared pytest fixtures for the Pydantic AI SQL agent tests
+"""
+import asyncio
+import hashlib
+import inspect
+import json
+from contextlib import nullcontext
+from functools import partial
+import os
+import re
+import shelve
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Any single test, or the agent run answering its prompt, taking longer than this fails the session
+SLOW_TEST_SECONDS = 30
+
+_slow_tests = []
+
+# Tests must share the module's agent rather than build their own
+_AGENT_CONSTRUCTION_RE = re.compile(r"\bAgent\(")
+
+
+def _completion_turn(request):
+    """What identifies a chat completion request regardless of live data
+
+    Tool results carry database rows, which differ between seeds and over time,
+    so a turn is keyed on the model, the user prompts and the role of each
+    message so far rather than on the full body.
+    """
+    if not request.body:
+        return None
+    body = json.loads(request.body)
+    messages = body.get("messages", [])
+    return (
+        body.get("model"),
+        tuple(message.get("role") for message in messages),
+        tuple(message.get("content") for message in messages if message.get("role") == "user"),
+    )
+
+
+def _match_completion_turn(r1, r2):
+    assert _completion_turn(r1) == _completion_turn(r2)
+
+
+def _agent_hash() -> str:
+    """Fingerprint of the agent's system prompt and tool code
+
+    Cached answers only hold for the rules and guard they were produced under,
+    so editing either must miss the cache rather than replay a stale answer.
+    """
+    import sql_guard
+    from pydantic_sql_agent import SYSTEM_PROMPT, _schema_hash, execute_sql_query
+
+    return _schema_hash("\0".join((SYSTEM_PROMPT, inspect.getsource(execute_sql_query), inspect.getsource(sql_guard))))
+
+
+class Answers(dict):
+    """Answers by prompt; a prompt whose run failed raises its exception when looked up
+
+    This keeps one failed LLM call to the test that asked for it.
+    """
+
+    def __getitem__(self, prompt):
+        answer = super().__getitem__(prompt)
+        if isinstance(answer, BaseException):
+            raise answer
+        return answer
+
+
+class CachedAgent:
+    """Agent wrapper that replays previous answers from a disk cache
+
+    Results are keyed by model, schema, agent fingerprint and prompt, so
+    changing the model, the schema, the system prompt or the tool code misses
+    the cache. Set PYTEST_REFRESH_LLM=1 to ignore cached answers and record
+    fresh ones. Calls that do reach the agent run inside cassette(), which
+    replays recorded HTTP traffic when cassettes are enabled.
+    """
+
+    def __init__(
+        self, agent, deps, model_name: str, schema_hash: str, agent_hash: str, store,
+        refresh: bool = False, cassette=None
+    ):
+        self.agent = agent
+        self.deps = deps
+        self.model_name = model_name
+        self.schema_hash = schema_hash
+        self.agent_hash = agent_hash
+        self.store = store
+        self.refresh = refresh
+        self.cassette = cassette or nullcontext
+        # Seconds each prompt's agent run took in this session, excluding cache hits
+        self.durations = {}
+
+    def _key(self, prompt: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{self.schema_hash}\0{self.agent_hash}\0{prompt}".encode()).hexdigest()
+
+    async def run(self, prompt: str, deps):
+        """Run the wrapped agent, recording how long the prompt took"""
+        start = time.perf_counter()
+        try:
+            return await self.agent.run(prompt, deps=deps)
+        finally:
+            self.durations[prompt] = time.perf_counter() - start
+
+    def run_many(self, prompts) -> Answers:
+        """Answer several prompts, running the uncached ones concurrently
+
+        Only successful answers are stored, so failed prompts are retried on the next run.
+        """
+        from pydantic_sql_agent import run_many
+
+        results = Answers()
+        missing = []
+        for prompt in dict.fromkeys(prompts):
+            key = self._key(prompt)
+            if not self.refresh and key in self.store:
+                results[prompt] = SimpleNamespace(data=self.store[key])
+            else:
+                missing.append(prompt)
+
+        if missing:
+            with self.cassette():
+                answers = asyncio.run(run_many(missing, return_exceptions=True, agent=self, deps=self.deps))
+            for prompt, result in zip(missing, answers):
+                if not isinstance(result, BaseException):
+                    self.store[self._key(prompt)] = result.data
+                results[prompt] = result
+        return results
+
+
+@pytest.fixture(scope="session")
+def env(request):
+    """Load .env once, when a test first needs configuration rather than at collection
+
+    Everything that imports the agent depends on this, so without an OpenRouter
+    key those tests are skipped before the database connection and agent setup.
+    Replaying cassettes needs no real key, so a placeholder is used instead.
+    Tests that need neither the model nor the database must not depend on it.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if request.config.getoption("llm_record_mode") == "none":
+        os.environ.setdefault("OPENROUTER_API_KEY", "cassette-replay")
+    elif not os.getenv("OPENROUTER_API_KEY"):
+        pytest.skip("OPENROUTER_API_KEY not set")
+
+
+@pytest.fixture(scope="session")
+def db_context(env):
+    """The agent's database context, with its connection pool released after the session"""
+    from pydantic_sql_agent import db_context
+
+    yield db_context
+    db_context.engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def agent_singleton(env):
+    """The module-level agent, so its tools and result schema are built only once"""
+    from pydantic_sql_agent import agent
+
+    return agent
+
+
+@pytest.fixture(scope="session")
+def cached_agent(request, agent_singleton, db_context):
+    """Session-wide agent whose answers persist across test runs"""
+    from pydantic_sql_agent import model, _schema_hash
+
+    cassette = None
+    record_mode = request.config.getoption("llm_record_mode")
+    if record_mode is not None:
+        import vcr
+
+        recorder = vcr.VCR(
+            cassette_library_dir=str(request.config.rootpath / "cassettes"),
+            record_mode=record_mode,
+            filter_headers=["authorization"],
+            # Every completion goes to the same URL, so concurrent requests are told apart by prompt and turn
+            match_on=("method", "uri", "completion_turn"),
+        )
+        recorder.register_matcher("completion_turn", _match_completion_turn)
+        cassette = partial(recorder.use_cassette, "agent_responses.yaml")
+
+    path = request.config.cache.mkdir("llm_responses") / "responses"
+    with shelve.open(str(path)) as store:
+        yield CachedAgent(
+            agent_singleton,
+            db_context,
+            model.model_name,
+            _schema_hash(db_context.full_schema),
+            _agent_hash(),
+            store,
+            refresh=os.getenv("PYTEST_REFRESH_LLM") == "1",
+            cassette=cassette,
+        )
+
+
+@pytest.fixture(scope="session")
+def results(request, cached_agent):
+    """Answers to the prompts of every collected test, fetched concurrently up front"""
+    prompts = {}
+    for item in request.session.items:
+        callspec = getattr(item, "callspec", None)
+        if callspec is not None and "prompt" in callspec.params:
+            prompts.setdefault(callspec.params["prompt"], []).append(item.nodeid)
+    answers = cached_agent.run_many(prompts)
+
+    # Agent latency is paid here rather than in the tests, so gate on each prompt's run
+    for prompt, duration in cached_agent.durations.items():
+        if duration > SLOW_TEST_SECONDS:
+            _slow_tests.extend((nodeid, duration) for nodeid in prompts[prompt])
+    return answers
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--llm-record-mode",
+        choices=("none", "once", "new_episodes", "all"),
+        default=None,
+        help="replay or record agent HTTP traffic in cassettes/ with vcrpy; 'none' never touches the network",
+    )
+
+
+def pytest_collection_modifyitems(items):
+    for path in {item.path for item in items}:
+        if _AGENT_CONSTRUCTION_RE.search(path.read_text()):
+            raise pytest.UsageError(f"{path.name} constructs an Agent; use the agent_singleton fixture instead")
+
+    # Anything answered by the LLM is expensive, including cases added later
+    for item in items:
+        if "results" in item.fixturenames:
+            item.add_marker(pytest.mark.expensive)
+
+
+def pytest_runtest_logreport(report):
+    if report.when == "call" and report.duration > SLOW_TEST_SECONDS:
+        _slow_tests.append((report.nodeid, report.duration))
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _slow_tests:
+        terminalreporter.section(f"tests slower than {SLOW_TEST_SECONDS}s")
+        for nodeid, duration in _slow_tests:
+            terminalreporter.write_line(f"{duration:.1f}s {nodeid}")
+
+
+def pytest_sessionfinish(session):
+    # Surface latency regressions as a failed run even when every assertion passed
+    if _slow_tests and session.exitstatus == pytest.ExitCode.OK:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
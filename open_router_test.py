@@ -1,3 +1,4 @@
+import asyncio
 from langchain_openai import ChatOpenAI
 from os import getenv
 from dotenv import load_dotenv
@@ -5,6 +6,9 @@ from dotenv import load_dotenv
 load_dotenv()
 model_name = "anthropic/claude-opus-4.5"  # Replace with your desired model name
 
+# Maximum number of OpenRouter requests in flight at once
+MAX_CONCURRENCY = 5
+
 llm = ChatOpenAI(
     api_key=getenv("OPENROUTER_API_KEY"),
     base_url="https://openrouter.ai/api/v1",
@@ -23,10 +27,21 @@ prompt_3 = "Write a poem about the ocean."
 
 prompts_list = [prompt_1, prompt_2, prompt_3]
 
-for prompt in prompts_list:
-    response = llm.invoke(prompt)
+
+async def main():
+    """Send all prompts concurrently and print answers in input order"""
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def ask(prompt):
+        async with sem:
+            return await llm.ainvoke(prompt)
+
+    responses = await asyncio.gather(*(ask(prompt) for prompt in prompts_list))
+
     #Format question and answer, print them
-    
+    for prompt, response in zip(prompts_list, responses):
+        print(f"Q: {prompt}\nA: {response.content}\n")
 
-    print(f"Q: {prompt}\nA: {response.content}\n")
 
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,19 +1,94 @@
 from pydantic_ai import Agent, RunContext
 from pydantic_ai.models.openai import OpenAIModel
-from pydantic import BaseModel, Field
-from sqlalchemy import create_engine, inspect, text, MetaData, Table
-from sqlalchemy.orm import sessionmaker
-from contextlib import contextmanager
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import create_engine, text, MetaData, Table
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
 from typing import Literal
 from os import getenv
+import asyncio
+import hashlib
+import io
+import sqlite3
+import sys
+import threading
+import time
 from dotenv import load_dotenv
 import tiktoken
+from sql_guard import is_select_only
 
 load_dotenv()
 
+# Tokenizer used to measure schema size; loading the BPE table is costly, so do it once
+_ENC = tiktoken.get_encoding("cl100k_base")
+
+# Maximum number of rows returned to the agent per query
+MAX_RESULT_ROWS = 100
+
+# Connection pool settings for the agent's database engine
+POOL_SIZE = 10
+POOL_MAX_OVERFLOW = 20
+POOL_RECYCLE_SECONDS = 1800
+
+# Batch mode limits for concurrent agent runs against OpenRouter
+MAX_CONCURRENCY = 5
+MAX_REQUESTS_PER_MINUTE = 60
+
+# Seconds a cached interactive answer stays valid
+RESPONSE_CACHE_TTL = 300
+
+# Number of distinct SQL queries whose formatted results are kept in memory, and for how long.
+# Query results are cached before the answer built from them, so with the same TTL they
+# always expire first and an expired answer is never rebuilt from stale rows
+QUERY_CACHE_SIZE = 256
+QUERY_CACHE_TTL = RESPONSE_CACHE_TTL
+
+# File that persists generated SQL per question across restarts
+SQL_CACHE_PATH = ".sql_cache.sqlite3"
+
+
+# Schema catalog queries. pg_catalog is used rather than information_schema because
+# information_schema hides constraints from roles that only hold SELECT privileges.
+_COLUMNS_SQL = text("""
+    SELECT c.relname, a.attname, format_type(a.atttypid, a.atttypmod),
+           NOT a.attnotnull, pg_get_expr(d.adbin, d.adrelid)
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+    LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = c.oid AND d.adnum = a.attnum
+    WHERE n.nspname = current_schema()
+      AND c.relkind IN ('r', 'p')
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+    ORDER BY c.relname, a.attnum
+""")
+
+_CONSTRAINTS_SQL = text("""
+    SELECT c.relname, con.contype,
+           ARRAY(SELECT a.attname::text
+                 FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+                 JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+                 ORDER BY k.ord),
+           rc.relname::text,
+           ARRAY(SELECT a.attname::text
+                 FROM unnest(con.confkey) WITH ORDINALITY AS k(attnum, ord)
+                 JOIN pg_catalog.pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum
+                 ORDER BY k.ord)
+    FROM pg_catalog.pg_constraint con
+    JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_catalog.pg_class rc ON rc.oid = con.confrelid
+    WHERE n.nspname = current_schema()
+      AND con.contype IN ('p', 'f')
+    ORDER BY c.relname, con.contype DESC, con.conname
+""")
+
 
 class QueryResult(BaseModel):
     """Single model for all SQL operations"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     type: Literal["query", "error", "info"] = Field(description="Type of result")
     content: str = Field(description="Query result, error message, or info")
     details: str | None = Field(default=None, description="Additional details like SQL query")
@@ -24,118 +99,243 @@ class DatabaseContext:
     
     def __init__(self, db_uri: str):
         self.db_uri = db_uri
-        self.engine = create_engine(db_uri)
-        self.SessionLocal = sessionmaker(bind=self.engine)
-        self.full_schema = self._load_full_schema()
+        # Keep live connections pooled so repeated and concurrent queries skip the handshake
+        self.engine = create_engine(
+            db_uri,
+            pool_size=POOL_SIZE,
+            max_overflow=POOL_MAX_OVERFLOW,
+            pool_pre_ping=True,
+            pool_recycle=POOL_RECYCLE_SECONDS,
+        )
+        self.table_schemas = self._load_table_schemas()
+        self.last_token_count = 0
+        self.full_schema = "\n".join(full for full, _ in self.table_schemas)
+        self._schema_for_prompt = lru_cache(maxsize=8)(self._build_schema_for_prompt)
+        # The agent connects read-only, so identical SQL can be served from memory for a while.
+        # Maps query -> (monotonic time stored, result); the tool runs queries from worker threads
+        self._query_cache: dict[str, tuple[float, str]] = {}
+        self._query_cache_lock = threading.Lock()
         
-    def _load_full_schema(self) -> str:
-        """Preload full database schema on startup"""
-        inspector = inspect(self.engine)
-        schema_parts = []
+    def _load_table_schemas(self) -> list[tuple[str, str]]:
+        """Preload full and basic schema text per table with two catalog queries
+        
+        Tables are ordered most-referenced first so that, if the prompt budget
+        runs out, the tables other tables depend on are the ones kept.
+        """
+        with self.engine.connect() as conn:
+            column_rows = conn.execute(_COLUMNS_SQL).all()
+            constraint_rows = conn.execute(_CONSTRAINTS_SQL).all()
+        
+        constraints = {
+            table_name: list(rows)
+            for table_name, rows in groupby(constraint_rows, key=itemgetter(0))
+        }
+        tables = {}
+        reference_counts = {}
         
-        for table_name in inspector.get_table_names():
-            schema_parts.append(f"\nTable: {table_name}")
-            columns = inspector.get_columns(table_name)
+        for table_name, columns in groupby(column_rows, key=itemgetter(0)):
+            schema_parts = [f"\nTable: {table_name}"]
+            # Basic form: keep table names and basic column info, remove descriptions
+            basic_parts = [f"\nTable: {table_name}"]
             
-            for col in columns:
-                col_type = str(col['type'])
-                nullable = "NULL" if col['nullable'] else "NOT NULL"
-                default = f" DEFAULT {col['default']}" if col.get('default') else ""
-                schema_parts.append(f"  - {col['name']}: {col_type} {nullable}{default}")
+            for _, col_name, col_type, col_nullable, col_default in columns:
+                nullable = "NULL" if col_nullable else "NOT NULL"
+                default = f" DEFAULT {col_default}" if col_default else ""
+                schema_parts.append(f"  - {col_name}: {col_type} {nullable}{default}")
+                basic_parts.append(f"  - {col_name}: {col_type}")
             
-            # Get primary keys
-            pk = inspector.get_pk_constraint(table_name)
-            if pk and pk['constrained_columns']:
-                schema_parts.append(f"  PRIMARY KEY: {', '.join(pk['constrained_columns'])}")
+            # Primary key first, then foreign keys (kept in both forms as they're critical)
+            for _, kind, key_columns, referred_table, referred_columns in constraints.get(table_name, []):
+                key_columns = ', '.join(key_columns)
+                if kind == "p":
+                    schema_parts.append(f"  PRIMARY KEY: {key_columns}")
+                    basic_parts.append(f"  PK: {key_columns}")
+                else:
+                    schema_parts.append(
+                        f"  FOREIGN KEY: {key_columns} -> "
+                        f"{referred_table}({', '.join(referred_columns)})"
+                    )
+                    basic_parts.append(f"  FK: {key_columns} -> {referred_table}")
+                    reference_counts[referred_table] = reference_counts.get(referred_table, 0) + 1
             
-            # Get foreign keys
-            fks = inspector.get_foreign_keys(table_name)
-            for fk in fks:
-                schema_parts.append(
-                    f"  FOREIGN KEY: {', '.join(fk['constrained_columns'])} -> "
-                    f"{fk['referred_table']}({', '.join(fk['referred_columns'])})"
-                )
+            tables[table_name] = ("\n".join(schema_parts), "\n".join(basic_parts))
         
-        return "\n".join(schema_parts)
+        order = sorted(tables, key=lambda name: (-reference_counts.get(name, 0), name))
+        return [tables[name] for name in order]
     
     def get_schema_for_prompt(self, max_tokens: int = 2000) -> str:
-        """Get schema for system prompt, with truncation if needed"""
-        encoding = tiktoken.get_encoding("cl100k_base")
-        tokens = encoding.encode(self.full_schema)
+        """Get schema for system prompt, with truncation if needed
         
-        if len(tokens) <= max_tokens:
-            return self.full_schema
+        The token count of the returned schema is kept in ``last_token_count``.
+        """
+        schema, self.last_token_count = self._schema_for_prompt(max_tokens)
+        return schema
+    
+    def _build_schema_for_prompt(self, max_tokens: int) -> tuple[str, int]:
+        """Build the prompt schema table by table within a token budget (memoized per budget)
         
-        # Truncate: keep table names and basic column info, remove descriptions
-        inspector = inspect(self.engine)
+        Each table is added in full if it fits, otherwise in its basic form,
+        otherwise the remaining tables are dropped. Only emitted text is tokenized.
+        """
         schema_parts = []
+        token_count = 0
+        reduced = 0
         
-        for table_name in inspector.get_table_names():
-            schema_parts.append(f"\nTable: {table_name}")
-            columns = inspector.get_columns(table_name)
-            
-            # Basic columns only
-            for col in columns:
-                col_type = str(col['type'])
-                schema_parts.append(f"  - {col['name']}: {col_type}")
-            
-            # Keep primary and foreign keys as they're critical
-            pk = inspector.get_pk_constraint(table_name)
-            if pk and pk['constrained_columns']:
-                schema_parts.append(f"  PK: {', '.join(pk['constrained_columns'])}")
+        for full, basic in self.table_schemas:
+            full_tokens = len(_ENC.encode(full))
+            if token_count + full_tokens <= max_tokens:
+                schema_parts.append(full)
+                token_count += full_tokens
+                continue
             
-            fks = inspector.get_foreign_keys(table_name)
-            for fk in fks:
-                schema_parts.append(
-                    f"  FK: {', '.join(fk['constrained_columns'])} -> {fk['referred_table']}"
-                )
-        
-        truncated_schema = "\n".join(schema_parts)
-        truncated_tokens = encoding.encode(truncated_schema)
+            basic_tokens = len(_ENC.encode(basic))
+            if token_count + basic_tokens > max_tokens:
+                break
+            schema_parts.append(basic)
+            token_count += basic_tokens
+            reduced += 1
         
-        print(f"⚠️  Schema truncated: {len(tokens)} -> {len(truncated_tokens)} tokens")
-        return truncated_schema
+        omitted = len(self.table_schemas) - len(schema_parts)
+        if reduced or omitted:
+            print(
+                f"⚠️  Schema truncated to {token_count} tokens "
+                f"({reduced} table(s) reduced to basic columns, {omitted} omitted)"
+            )
+        return "\n".join(schema_parts), token_count
     
-    @contextmanager
-    def get_session(self):
-        """Context manager for database sessions"""
-        session = self.SessionLocal()
-        try:
-            yield session
-            session.commit()
-        except Exception:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+    def execute_query(self, query: str, use_cache: bool = True) -> str:
+        """Execute a SQL query and return results, reusing recent results of identical queries
+        
+        With use_cache=False the database is always queried; the fresh result is still cached.
+        """
+        query = query.strip().rstrip(";").strip()
+        if use_cache:
+            with self._query_cache_lock:
+                entry = self._query_cache.get(query)
+            if entry is not None and time.monotonic() - entry[0] <= QUERY_CACHE_TTL:
+                return entry[1]
+        
+        stored_at = time.monotonic()
+        result = self._execute_query_uncached(query)
+        with self._query_cache_lock:
+            # Re-insert so the entry moves to the end; dicts keep insertion order, so the first is the oldest
+            self._query_cache.pop(query, None)
+            if len(self._query_cache) >= QUERY_CACHE_SIZE:
+                del self._query_cache[next(iter(self._query_cache))]
+            self._query_cache[query] = (stored_at, result)
+        return result
     
-    def execute_query(self, query: str) -> str:
-        """Execute a SQL query and return results"""
-        with self.get_session() as session:
-            result = session.execute(text(query))
+    def _execute_query_uncached(self, query: str) -> str:
+        """Execute a SQL query against the database and format the results"""
+        # Plain connection for read-only SQL; closing it rolls back and returns it to the pool
+        with self.engine.connect() as conn:
+            result = conn.execute(text(query))
             
             # Handle different result types
             if result.returns_rows:
-                rows = result.fetchall()
+                # Fetch one row past the display limit to detect overflow
+                rows = result.fetchmany(MAX_RESULT_ROWS + 1)
                 if not rows:
                     return "Query executed successfully. No rows returned."
                 
-                # Format results as a table
-                columns = result.keys()
-                output = [" | ".join(str(col) for col in columns)]
-                output.append("-" * len(output[0]))
+                # Format results as a table in a single buffer
+                sep = " | "
+                header = sep.join(map(str, result.keys()))
+                buf = io.StringIO()
+                buf.write(header)
+                buf.write("\n")
+                buf.write("-" * len(header))
                 
-                for row in rows[:100]:  # Limit to 100 rows
-                    output.append(" | ".join(str(val) for val in row))
+                for row in rows[:MAX_RESULT_ROWS]:
+                    buf.write("\n")
+                    buf.write(sep.join(map(str, row)))
                 
-                if len(rows) > 100:
-                    output.append(f"\n... ({len(rows) - 100} more rows)")
+                if len(rows) > MAX_RESULT_ROWS:
+                    buf.write("\n\n... (more rows)")
                 
-                return "\n".join(output)
+                return buf.getvalue()
             else:
                 return "Query executed successfully."
 
 
+def _schema_hash(schema: str) -> str:
+    """Short fingerprint of the schema, so cached entries are tied to the schema they came from"""
+    return hashlib.blake2b(schema.encode(), digest_size=8).hexdigest()
+
+
+def _normalize_question(question: str) -> str:
+    """Normalize case and whitespace so trivially different questions share a cache entry"""
+    return " ".join(question.lower().split())
+
+
+class ResponseCache:
+    """Exact-match cache of agent answers keyed by normalized question"""
+    
+    def __init__(self, schema: str, ttl: float = RESPONSE_CACHE_TTL):
+        # Answers are only valid for the schema they were generated against
+        self.schema_hash = _schema_hash(schema)
+        self.ttl = ttl
+        self._entries: dict[tuple[str, str], tuple[float, QueryResult]] = {}
+    
+    def _key(self, question: str) -> tuple[str, str]:
+        return self.schema_hash, _normalize_question(question)
+    
+    def get(self, question: str) -> QueryResult | None:
+        """Return the cached answer for a question, or None if missing or expired"""
+        key = self._key(question)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        stored_at, data = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        return data
+    
+    def put(self, question: str, data: QueryResult):
+        """Cache an answer; errors are not cached so they can be retried"""
+        if data.type != "error":
+            self._entries[self._key(question)] = (time.monotonic(), data)
+
+
+class SQLCache:
+    """Persistent cache of generated SQL keyed by schema hash and normalized question
+    
+    Unlike ResponseCache this stores the SQL rather than its results, so a hit
+    skips the LLM but still reads current data from the database.
+    """
+    
+    def __init__(self, schema: str, path: str = SQL_CACHE_PATH):
+        self.schema_hash = _schema_hash(schema)
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sql_cache (
+                    schema_hash TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    sql_query TEXT NOT NULL,
+                    PRIMARY KEY (schema_hash, question)
+                )
+            """)
+    
+    def get(self, question: str) -> str | None:
+        """Return the cached SQL for a question, or None if not cached"""
+        row = self._conn.execute(
+            "SELECT sql_query FROM sql_cache WHERE schema_hash = ? AND question = ?",
+            (self.schema_hash, _normalize_question(question))
+        ).fetchone()
+        return row[0] if row else None
+    
+    def put(self, question: str, sql_query: str):
+        """Cache the SQL generated for a question"""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_cache (schema_hash, question, sql_query) VALUES (?, ?, ?)",
+                (self.schema_hash, _normalize_question(question), sql_query)
+            )
+
+
 # Initialize database context
 db_uri = f"postgresql://{getenv('DB_READONLY_USER')}:{getenv('DB_READONLY_PASSWORD')}@{getenv('DB_HOST', 'localhost')}:{getenv('DB_PORT', '5432')}/ecommerce"
 
@@ -143,7 +343,7 @@ try:
     db_context = DatabaseContext(db_uri)
     schema_for_prompt = db_context.get_schema_for_prompt(max_tokens=2000)
     print("✓ Connected to database successfully")
-    print(f"✓ Schema loaded ({len(tiktoken.get_encoding('cl100k_base').encode(schema_for_prompt))} tokens)")
+    print(f"✓ Schema loaded ({db_context.last_token_count} tokens)")
 except Exception as e:
     print(f"❌ Error connecting to database: {e}")
     print("\nMake sure you have:")
@@ -159,10 +359,7 @@ model = OpenAIModel(
     base_url="https://openrouter.ai/api/v1",
 )
 
-agent = Agent(
-    model=model,
-    result_type=QueryResult,
-    system_prompt=f"""You are a SQL query assistant for a PostgreSQL e-commerce database.
+SYSTEM_PROMPT = f"""You are a SQL query assistant for a PostgreSQL e-commerce database.
 
 Database Schema:
 {schema_for_prompt}
@@ -180,7 +377,12 @@ When responding:
 - Set type="error" for errors with content containing the error message
 - Set type="info" for clarifications or explanations
 - Include the SQL query in the details field when applicable
-""",
+"""
+
+agent = Agent(
+    model=model,
+    result_type=QueryResult,
+    system_prompt=SYSTEM_PROMPT,
     deps_type=DatabaseContext,
 )
 
@@ -197,27 +399,27 @@ async def execute_sql_query(ctx: RunContext[DatabaseContext], sql_query: str) ->
     Returns:
         QueryResult with query results or error information
     """
+    # Fields are built from trusted values here, so skip re-validation on this hot path
     try:
         # Validate it's a SELECT query
-        query_upper = sql_query.strip().upper()
-        if not query_upper.startswith("SELECT"):
-            return QueryResult(
+        if not is_select_only(sql_query):
+            return QueryResult.model_construct(
                 type="error",
                 content="Only SELECT queries are allowed for security reasons.",
                 details=sql_query
             )
         
-        # Execute query
-        result = ctx.deps.execute_query(sql_query)
+        # Execute query off the event loop so concurrent runs don't block each other
+        result = await asyncio.to_thread(ctx.deps.execute_query, sql_query)
         
-        return QueryResult(
+        return QueryResult.model_construct(
             type="query",
             content=result,
             details=sql_query
         )
         
     except Exception as e:
-        return QueryResult(
+        return QueryResult.model_construct(
             type="error",
             content=f"Query execution failed: {str(e)}",
             details=sql_query
@@ -244,8 +446,92 @@ for i, query in enumerate(example_queries, 1):
 print("\n" + "=" * 60)
 
 
+async def run_many(
+    questions: list[str],
+    max_concurrency: int = MAX_CONCURRENCY,
+    max_requests_per_minute: int = MAX_REQUESTS_PER_MINUTE,
+    return_exceptions: bool = False,
+    agent: Agent = agent,
+    deps: DatabaseContext = db_context,
+) -> list:
+    """Run the agent over several questions concurrently, returning results in input order
+    
+    With return_exceptions=True a failed run yields its exception in place of a result
+    instead of aborting the whole batch. agent and deps default to this module's.
+    """
+    sem = asyncio.Semaphore(max_concurrency)
+    interval = 60 / max_requests_per_minute
+    
+    async def one(index: int, question: str):
+        # Stagger start times to stay under the requests-per-minute limit
+        await asyncio.sleep(index * interval)
+        async with sem:
+            return await agent.run(question, deps=deps)
+    
+    return await asyncio.gather(*(one(i, q) for i, q in enumerate(questions)), return_exceptions=return_exceptions)
+
+
+def print_result(data: QueryResult):
+    """Display a QueryResult on the console"""
+    if data.type == "query":
+        print(f"\nAnswer:\n{data.content}")
+        if data.details:
+            print(f"\nSQL Query:\n{data.details}")
+    elif data.type == "error":
+        print(f"\n❌ Error: {data.content}")
+        if data.details:
+            print(f"Query attempted: {data.details}")
+    else:
+        print(f"\nℹ️  {data.content}")
+
+
+def answer_question(question: str, response_cache: ResponseCache, sql_cache: SQLCache) -> QueryResult:
+    """Answer a question, skipping the LLM when a cached answer or cached SQL is available"""
+    # Reuse a previous answer to the same question if still fresh
+    data = response_cache.get(question)
+    if data is not None:
+        print("(cached answer)")
+        return data
+    
+    # Rerun previously generated SQL against current data
+    sql_query = sql_cache.get(question)
+    if sql_query is not None and is_select_only(sql_query):
+        try:
+            data = QueryResult(
+                type="query", content=db_context.execute_query(sql_query, use_cache=False), details=sql_query
+            )
+            print("(cached SQL)")
+        except Exception:
+            # Fall back to the agent if the cached SQL no longer runs
+            data = None
+    
+    if data is None:
+        # Run agent synchronously
+        data = agent.run_sync(question, deps=db_context).data
+        if data.type == "query" and data.details and is_select_only(data.details):
+            sql_cache.put(question, data.details)
+    
+    response_cache.put(question, data)
+    return data
+
+
+# Batch mode: python pydantic_sql_agent.py --batch [question ...]
+if __name__ == "__main__" and "--batch" in sys.argv:
+    questions = [arg for arg in sys.argv[1:] if arg != "--batch"] or example_queries
+    print(f"\nRunning {len(questions)} question(s) in batch mode...\n")
+    
+    results = asyncio.run(run_many(questions))
+    
+    for question, result in zip(questions, results):
+        print(f"\nQuestion: {question}")
+        print_result(result.data)
+        print("\n" + "-" * 60)
+
 # Interactive mode
-if __name__ == "__main__":
+elif __name__ == "__main__":
+    response_cache = ResponseCache(db_context.full_schema)
+    sql_cache = SQLCache(db_context.full_schema)
+    
     print("\nEnter your questions (or 'quit' to exit):\n")
     
     while True:
@@ -261,20 +547,10 @@ if __name__ == "__main__":
             
             print("\nProcessing...\n")
             
-            # Run agent synchronously
-            result = agent.run_sync(question, deps=db_context)
+            data = answer_question(question, response_cache, sql_cache)
             
             # Display result
-            if result.data.type == "query":
-                print(f"\nAnswer:\n{result.data.content}")
-                if result.data.details:
-                    print(f"\nSQL Query:\n{result.data.details}")
-            elif result.data.type == "error":
-                print(f"\n❌ Error: {result.data.content}")
-                if result.data.details:
-                    print(f"Query attempted: {result.data.details}")
-            else:
-                print(f"\nℹ️  {result.data.content}")
+            print_result(data)
             
             print("\n" + "-" * 60)
             
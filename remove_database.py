@@ -1,5 +1,5 @@
-import psycopg2
-from psycopg2 import sql, errors
+import psycopg
+from psycopg import sql
 from dotenv import load_dotenv
 import os
 
@@ -8,15 +8,14 @@ load_dotenv()
 def connect_to_postgres():
     """Connect to PostgreSQL server (not specific database)"""
     try:
-        conn = psycopg2.connect(
+        return psycopg.connect(
             host=os.getenv("DB_HOST", "localhost"),
             port=os.getenv("DB_PORT", "5432"),
             user=os.getenv("DB_ADMIN_USER"),
             password=os.getenv("DB_ADMIN_PASSWORD"),
-            database="postgres"
+            dbname="postgres",
+            autocommit=True
         )
-        conn.autocommit = True
-        return conn
     except Exception as e:
         print(f"Error connecting to PostgreSQL: {e}")
         raise
@@ -44,11 +43,17 @@ def confirm_removal():
         print("\n✓ Operation cancelled. Database was not removed.")
         return False
 
-def terminate_connections(conn, database_name):
+def check_existing(cursor, database_name, username):
+    """Check whether the database and user exist in a single round trip"""
+    cursor.execute("""
+        SELECT EXISTS (SELECT 1 FROM pg_database WHERE datname = %s),
+               EXISTS (SELECT 1 FROM pg_roles WHERE rolname = %s)
+    """, (database_name, username))
+    return cursor.fetchone()
+
+def terminate_connections(cursor, database_name):
     """Terminate all active connections to the database"""
     try:
-        cursor = conn.cursor()
-        
         # Terminate all connections to the database (except our own)
         cursor.execute("""
             SELECT pg_terminate_backend(pg_stat_activity.pid)
@@ -60,48 +65,30 @@ def terminate_connections(conn, database_name):
         terminated_count = cursor.rowcount
         if terminated_count > 0:
             print(f"✓ Terminated {terminated_count} active connection(s) to '{database_name}'")
-        
-        cursor.close()
     except Exception as e:
         print(f"Warning: Error terminating connections: {e}")
-        # Continue anyway - database might not exist
+        # Continue anyway - the drop will report any real problem
 
-def drop_database(conn, database_name):
+def drop_database(cursor, database_name, exists):
     """Drop the database if it exists"""
     try:
-        cursor = conn.cursor()
-        
-        # Check if database exists
-        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (database_name,))
-        exists = cursor.fetchone()
-        
         if exists:
             cursor.execute(sql.SQL("DROP DATABASE {}").format(sql.Identifier(database_name)))
             print(f"✓ Database '{database_name}' has been removed")
         else:
             print(f"✓ Database '{database_name}' does not exist (nothing to remove)")
-        
-        cursor.close()
     except Exception as e:
         print(f"Error dropping database: {e}")
         raise
 
-def drop_user(conn, username):
+def drop_user(cursor, username, exists):
     """Drop the readonly user if it exists"""
     try:
-        cursor = conn.cursor()
-        
-        # Check if user exists
-        cursor.execute("SELECT 1 FROM pg_roles WHERE rolname = %s", (username,))
-        exists = cursor.fetchone()
-        
         if exists:
             cursor.execute(sql.SQL("DROP USER {}").format(sql.Identifier(username)))
             print(f"✓ User '{username}' has been removed")
         else:
             print(f"✓ User '{username}' does not exist (nothing to remove)")
-        
-        cursor.close()
     except Exception as e:
         print(f"Error dropping user: {e}")
         raise
@@ -115,23 +102,25 @@ def main():
     if not confirm_removal():
         return
     
-    conn = None
     try:
         print("\n" + "-"*60)
         print("Starting database removal process...")
         print("-"*60 + "\n")
         
-        # Connect to PostgreSQL
-        conn = connect_to_postgres()
-        
-        # Terminate active connections
-        terminate_connections(conn, database_name)
-        
-        # Drop the database
-        drop_database(conn, database_name)
-        
-        # Drop the readonly user
-        drop_user(conn, readonly_user)
+        # Connect to PostgreSQL and share one cursor across all steps
+        with connect_to_postgres() as conn, conn.cursor() as cursor:
+            # Check database and user existence together
+            db_exists, user_exists = check_existing(cursor, database_name, readonly_user)
+            
+            # Terminate active connections (nothing to terminate if the database is gone)
+            if db_exists:
+                terminate_connections(cursor, database_name)
+            
+            # Drop the database (DROP DATABASE must run as its own statement)
+            drop_database(cursor, database_name, db_exists)
+            
+            # Drop the readonly user
+            drop_user(cursor, readonly_user, user_exists)
         
         print("\n" + "="*60)
         print("✓ Database removal completed successfully")
@@ -142,9 +131,6 @@ def main():
         print(f"✗ Error during removal process: {e}")
         print("="*60)
         raise
-    finally:
-        if conn:
-            conn.close()
 
 if __name__ == "__main__":
     main()
@@ -2,11 +2,35 @@ from langchain_openai import ChatOpenAI
 from langchain_community.utilities import SQLDatabase
 from langchain_community.agent_toolkits import create_sql_agent
 from langchain.agents.agent_types import AgentType
+from sqlalchemy import create_engine
 from os import getenv
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+class CachedSQLDatabase(SQLDatabase):
+    """SQLDatabase that memoizes schema lookups, since the schema is static while the agent runs"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._usable_table_names = None
+        self._table_info_cache = {}
+    
+    def get_usable_table_names(self):
+        """Get names of usable tables, querying the catalog only once"""
+        if self._usable_table_names is None:
+            self._usable_table_names = tuple(super().get_usable_table_names())
+        return self._usable_table_names
+    
+    def get_table_info(self, table_names=None):
+        """Get table info, cached per requested set of tables"""
+        # The toolkit passes a list, which isn't hashable
+        key = tuple(table_names) if table_names is not None else None
+        if key not in self._table_info_cache:
+            self._table_info_cache[key] = super().get_table_info(table_names)
+        return self._table_info_cache[key]
+
 # Initialize the LLM
 model_name = "anthropic/claude-opus-4.5"
 llm = ChatOpenAI(
@@ -18,31 +42,6 @@ llm = ChatOpenAI(
 # Connect to PostgreSQL database with readonly credentials
 db_uri = f"postgresql://{getenv('DB_READONLY_USER')}:{getenv('DB_READONLY_PASSWORD')}@{getenv('DB_HOST', 'localhost')}:{getenv('DB_PORT', '5432')}/ecommerce"
 
-try:
-    db = SQLDatabase.from_uri(db_uri)
-    print("✓ Connected to database successfully")
-    print(f"✓ Available tables: {db.get_usable_table_names()}")
-except Exception as e:
-    print(f"❌ Error connecting to database: {e}")
-    print("\nMake sure you have:")
-    print("1. Set up the database by running: python setup_database.py")
-    print("2. Configured your .env file with database credentials")
-    exit(1)
-
-# Create SQL agent
-agent_executor = create_sql_agent(
-    llm=llm,
-    db=db,
-    agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    verbose=True,
-    handle_parsing_errors=True
-)
-
-# Example queries
-print("\n" + "=" * 60)
-print("SQL Agent Ready - Example Queries")
-print("=" * 60)
-
 example_queries = [
     "How many customers do we have?",
     "What are the top 5 best-selling products?",
@@ -51,14 +50,54 @@ example_queries = [
     "What is the average order value?"
 ]
 
-print("\nYou can ask questions like:")
-for i, query in enumerate(example_queries, 1):
-    print(f"{i}. {query}")
 
-print("\n" + "=" * 60)
+def build_agent():
+    """Connect to the database and create the SQL agent"""
+    # Pooled engine so the agent's several tool calls per question reuse live connections
+    engine = create_engine(
+        db_uri,
+        pool_size=5,
+        max_overflow=5,
+        pool_pre_ping=True,
+        pool_recycle=300,
+    )
+    db = CachedSQLDatabase(engine)
+    print("✓ Connected to database successfully")
+    print(f"✓ Available tables: {db.get_usable_table_names()}")
+    
+    # Create SQL agent
+    return create_sql_agent(
+        llm=llm,
+        db=db,
+        agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=True,
+        handle_parsing_errors=True
+    )
+
 
-# Interactive mode
-if __name__ == "__main__":
+def main():
+    """Run the agent interactively"""
+    try:
+        agent_executor = build_agent()
+    except Exception as e:
+        print(f"❌ Error connecting to database: {e}")
+        print("\nMake sure you have:")
+        print("1. Set up the database by running: python setup_database.py")
+        print("2. Configured your .env file with database credentials")
+        return 1
+    
+    # Example queries
+    print("\n" + "=" * 60)
+    print("SQL Agent Ready - Example Queries")
+    print("=" * 60)
+    
+    print("\nYou can ask questions like:")
+    for i, query in enumerate(example_queries, 1):
+        print(f"{i}. {query}")
+    
+    print("\n" + "=" * 60)
+    
+    # Interactive mode
     print("\nEnter your questions (or 'quit' to exit):\n")
     
     while True:
@@ -73,8 +112,10 @@ if __name__ == "__main__":
                 continue
             
             print("\nProcessing...\n")
-            response = agent_executor.invoke({"input": question})
-            print(f"\nAnswer: {response['output']}\n")
+            # Stream agent steps as they happen; the final chunk carries the answer
+            for chunk in agent_executor.stream({"input": question}):
+                if "output" in chunk:
+                    print(f"\nAnswer: {chunk['output']}\n", flush=True)
             print("-" * 60)
             
         except KeyboardInterrupt:
@@ -83,3 +124,9 @@ if __name__ == "__main__":
         except Exception as e:
             print(f"\n❌ Error: {e}\n")
             print("-" * 60)
+    
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
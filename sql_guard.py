@@ -0,0 +1,14 @@
+"""
+Read-only guard for SQL generated by the agent
+
+Kept free of database and model setup so it can be imported and tested on its own.
+"""
+import re
+
+# Matches queries that start with SELECT without uppercasing the whole query
+_SELECT_RE = re.compile(r"\A\s*select\b", re.IGNORECASE)
+
+
+def is_select_only(sql_query: str) -> bool:
+    """Whether a query is a SELECT statement, the only kind the agent may run"""
+    return _SELECT_RE.match(sql_query) is not None
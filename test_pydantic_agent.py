@@ -2,370 +2,243 @@
 Test suite for Pydantic AI SQL Agent
 Focuses on query patterns from sql_agent.py and edge cases
 """
+import re
+from itertools import islice
+
 import pytest
-from pydantic_sql_agent import agent, db_context, QueryResult
-from dotenv import load_dotenv
-
-load_dotenv()
-
-
-class TestBasicQueries:
-    """Test basic query patterns from sql_agent.py examples"""
-    
-    def test_count_customers(self):
-        """Test: How many customers do we have?"""
-        result = agent.run_sync("How many customers do we have?", deps=db_context)
-        
-        assert result.data.type in ["query", "info"]
-        assert result.data.content is not None
-        if result.data.type == "query":
-            assert "50" in result.data.content or "customer" in result.data.content.lower()
-    
-    def test_top_selling_products(self):
-        """Test: What are the top 5 best-selling products?"""
-        result = agent.run_sync("What are the top 5 best-selling products?", deps=db_context)
-        
-        assert result.data.type in ["query", "info"]
-        assert result.data.content is not None
-        if result.data.type == "query":
-            # Should contain product information
-            assert result.data.details is not None  # SQL query should be included
-            assert "SELECT" in result.data.details.upper()
-    
-    def test_revenue_by_status(self):
-        """Test: Show me the total revenue by order status"""
-        result = agent.run_sync("Show me the total revenue by order status", deps=db_context)
-        
-        assert result.data.type in ["query", "info"]
-        assert result.data.content is not None
-        if result.data.type == "query":
-            # Should have status categories
-            content_lower = result.data.content.lower()
-            assert any(status in content_lower for status in ["completed", "pending", "shipped", "cancelled"])
-    
-    def test_customer_most_orders(self):
-        """Test: Which customer has placed the most orders?"""
-        result = agent.run_sync("Which customer has placed the most orders?", deps=db_context)
-        
-        assert result.data.type in ["query", "info"]
-        assert result.data.content is not None
-        if result.data.type == "query":
-            assert result.data.details is not None
-            # Should involve joins or subqueries
-            assert "customer" in result.data.details.lower()
-    
-    def test_average_order_value(self):
-        """Test: What is the average order value?"""
-        result = agent.run_sync("What is the average order value?", deps=db_context)
-        
-        assert result.data.type in ["query", "info"]
-        assert result.data.content is not None
-        if result.data.type == "query":
-            # Should contain AVG function
-            assert "AVG" in result.data.details.upper() or "average" in result.data.content.lower()
-
-
-class TestComplexJoins:
-    """Test complex multi-table joins"""
-    
-    def test_customer_order_details(self):
-        """Test joining customers, orders, and order_items"""
-        result = agent.run_sync(
-            "Show me customer names with their total spending and number of orders",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            query_upper = result.data.details.upper()
-            # Should join multiple tables
-            assert "JOIN" in query_upper
-            assert "customers" in result.data.details.lower()
-    
-    def test_product_order_relationship(self):
-        """Test complex join across products, order_items, and orders"""
-        result = agent.run_sync(
-            "Which products have never been ordered?",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            # Should use LEFT JOIN or NOT EXISTS
-            query_upper = result.data.details.upper()
-            assert "LEFT" in query_upper or "NOT EXISTS" in query_upper or "NOT IN" in query_upper
-    
-    def test_three_table_join(self):
-        """Test joining customers, orders, and products through order_items"""
-        result = agent.run_sync(
-            "Show me all customers who bought laptops",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            # Should join multiple tables
-            query_lower = result.data.details.lower()
-            assert query_lower.count("join") >= 2  # At least 2 joins needed
-
-
-class TestSubqueries:
-    """Test queries with subqueries"""
-    
-    def test_subquery_in_where(self):
-        """Test subquery in WHERE clause"""
-        result = agent.run_sync(
-            "Show me customers who have placed orders with total amount above the average",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            # Should contain subquery with AVG
-            assert "(" in result.data.details  # Subquery indicator
-    
-    def test_correlated_subquery(self):
-        """Test correlated subquery"""
-        result = agent.run_sync(
-            "Find products that are priced above the average price in their category",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-    
-    def test_subquery_in_select(self):
-        """Test subquery in SELECT clause"""
-        result = agent.run_sync(
-            "Show each customer with their total number of orders",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            query_upper = result.data.details.upper()
-            # Could use subquery or JOIN with GROUP BY
-            assert "COUNT" in query_upper or "GROUP BY" in query_upper
-
-
-class TestNullHandling:
-    """Test NULL value handling"""
-    
-    def test_null_filter(self):
-        """Test filtering NULL values"""
-        result = agent.run_sync(
-            "Show me products without a description",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            query_upper = result.data.details.upper()
-            assert "IS NULL" in query_upper or "IS NOT NULL" in query_upper
-    
-    def test_coalesce_usage(self):
-        """Test COALESCE for NULL handling"""
-        result = agent.run_sync(
-            "List all products with their descriptions, showing 'No description' if empty",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            # May use COALESCE or CASE
-            query_upper = result.data.details.upper()
-            assert "COALESCE" in query_upper or "CASE" in query_upper or "IS NULL" in query_upper
-
-
-class TestAggregations:
-    """Test various aggregation functions"""
-    
-    def test_multiple_aggregations(self):
-        """Test multiple aggregate functions in one query"""
-        result = agent.run_sync(
-            "Show me the min, max, and average product prices by category",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            query_upper = result.data.details.upper()
-            assert "GROUP BY" in query_upper
-            # Should have multiple aggregations
-            agg_count = sum(1 for func in ["MIN", "MAX", "AVG", "SUM", "COUNT"] if func in query_upper)
-            assert agg_count >= 2
-    
-    def test_having_clause(self):
-        """Test HAVING clause with aggregation"""
-        result = agent.run_sync(
-            "Show me customers who have placed more than 5 orders",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            query_upper = result.data.details.upper()
-            assert "GROUP BY" in query_upper
-            assert "HAVING" in query_upper or "WHERE" in query_upper
-
-
-class TestEdgeCases:
-    """Test edge cases and security"""
-    
-    def test_security_no_insert(self):
-        """Test that INSERT queries are rejected"""
-        result = agent.run_sync(
-            "INSERT INTO customers (first_name, last_name, email) VALUES ('Test', 'User', 'test@test.com')",
-            deps=db_context
-        )
-        
-        assert result.data.type == "error"
-        assert "not allowed" in result.data.content.lower() or "only select" in result.data.content.lower()
-    
-    def test_security_no_update(self):
-        """Test that UPDATE queries are rejected"""
-        result = agent.run_sync(
-            "UPDATE customers SET email = 'new@email.com' WHERE customer_id = 1",
-            deps=db_context
-        )
-        
-        assert result.data.type == "error"
-        assert "not allowed" in result.data.content.lower() or "only select" in result.data.content.lower()
-    
-    def test_security_no_delete(self):
-        """Test that DELETE queries are rejected"""
-        result = agent.run_sync(
-            "DELETE FROM customers WHERE customer_id = 1",
-            deps=db_context
-        )
-        
-        assert result.data.type == "error"
-        assert "not allowed" in result.data.content.lower() or "only select" in result.data.content.lower()
-    
-    def test_security_no_drop(self):
-        """Test that DROP queries are rejected"""
-        result = agent.run_sync(
-            "DROP TABLE customers",
-            deps=db_context
-        )
-        
-        assert result.data.type == "error"
-        assert "not allowed" in result.data.content.lower() or "only select" in result.data.content.lower()
-    
-    def test_empty_result(self):
-        """Test query that returns no rows"""
-        result = agent.run_sync(
-            "Show me customers with first name 'ZZZNonexistent'",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        # Should handle empty results gracefully
-    
-    def test_complex_filter(self):
-        """Test complex WHERE clause with multiple conditions"""
-        result = agent.run_sync(
-            "Show me orders placed by customers whose last name starts with 'S' and have a total amount over 500",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            query_upper = result.data.details.upper()
-            assert "WHERE" in query_upper
-            assert "AND" in query_upper or "OR" in query_upper
-
-
-class TestDataTypes:
-    """Test handling of different data types"""
-    
-    def test_decimal_handling(self):
-        """Test queries with DECIMAL types (prices, amounts)"""
-        result = agent.run_sync(
-            "Show me products priced between 100 and 500",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            query_upper = result.data.details.upper()
-            assert "BETWEEN" in query_upper or (">" in result.data.details and "<" in result.data.details)
-    
-    def test_timestamp_handling(self):
-        """Test queries with TIMESTAMP types"""
-        result = agent.run_sync(
-            "Show me orders placed in the last 30 days",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            # Should use date functions
-            query_upper = result.data.details.upper()
-            assert any(keyword in query_upper for keyword in ["NOW()", "CURRENT_", "INTERVAL", "DATE"])
-    
-    def test_string_pattern_matching(self):
-        """Test string pattern matching with LIKE"""
-        result = agent.run_sync(
-            "Find all customers whose email contains 'gmail'",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            query_upper = result.data.details.upper()
-            assert "LIKE" in query_upper or "ILIKE" in query_upper
-
-
-class TestSorting:
-    """Test ORDER BY and LIMIT clauses"""
-    
-    def test_order_by_desc(self):
-        """Test descending order"""
-        result = agent.run_sync(
-            "Show me the 10 most expensive products",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            query_upper = result.data.details.upper()
-            assert "ORDER BY" in query_upper
-            assert "DESC" in query_upper
-            assert "LIMIT" in query_upper or "TOP" in query_upper
-    
-    def test_multiple_order_columns(self):
-        """Test ordering by multiple columns"""
-        result = agent.run_sync(
-            "List customers ordered by last name and then first name",
-            deps=db_context
-        )
-        
-        assert result.data.type in ["query", "info"]
-        if result.data.type == "query":
-            assert result.data.details is not None
-            query_upper = result.data.details.upper()
-            assert "ORDER BY" in query_upper
-            # Should have comma in ORDER BY clause
-            order_by_index = query_upper.find("ORDER BY")
-            if order_by_index != -1:
-                after_order_by = result.data.details[order_by_index:]
-                assert "," in after_order_by
+from sql_guard import is_select_only
+
+
+def _tokens(pattern):
+    """Compile a case-insensitive token pattern once, at import"""
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def assert_query_ok(result, *sql_patterns, content_pattern=None, needs_details=True):
+    """Assert the agent answered with a query or info result
+
+    For query results, the answer must match content_pattern and, when
+    needs_details is set, the SQL must be present and match every pattern.
+    Returns the SQL of a query result (None for info) for further checks.
+    """
+    data = result.data
+    assert data.type in ("query", "info")
+    assert data.content is not None
+    if data.type != "query":
+        return None
+    if content_pattern is not None:
+        assert content_pattern.search(data.content)
+    if needs_details:
+        assert data.details is not None  # SQL query should be included
+        for pattern in sql_patterns:
+            assert pattern.search(data.details), pattern.pattern
+    return data.details
+
+
+def at_least_n(pattern, text, n):
+    """Whether pattern matches text at least n times, stopping at the nth match"""
+    return sum(1 for _ in islice(pattern.finditer(text), n)) == n
+
+
+# Token patterns, compiled once and shared by the cases and tests below
+_AGG_RE = _tokens(r"\b(MIN|MAX|AVG|SUM|COUNT)\b")  # aggregate functions, as whole words
+_AVG_RE = _tokens(r"AVG")
+_AVERAGE_RE = _tokens(r"average")
+_BETWEEN_RE = _tokens(r"BETWEEN")
+_DATE_RE = _tokens(r"NOW\(\)|CURRENT_|INTERVAL|DATE")
+_GROUP_BY_RE = _tokens(r"GROUP\s+BY")
+_JOIN_RE = _tokens(r"JOIN")
+_LIKE_RE = _tokens(r"I?LIKE")
+_NULL_RE = _tokens(r"IS\s+(NOT\s+)?NULL")
+_ORDER_BY_RE = _tokens(r"ORDER\s+BY")
+_REJECTED_RE = _tokens(r"not allowed|only select")
+_STATUS_RE = _tokens(r"completed|pending|shipped|cancelled")
+
+
+# (prompt, content_pattern, sql_patterns)
+# content_pattern: if set, the answer must match it
+# sql_patterns: if set, the SQL must be present and match every pattern
+QUERY_CASES = [
+    # Basic query patterns from sql_agent.py examples
+    pytest.param(
+        "How many customers do we have?", _tokens(r"50|customer"), None,
+        marks=pytest.mark.smoke, id="count_customers"
+    ),
+    pytest.param("What are the top 5 best-selling products?", None, (_tokens(r"SELECT"),), id="top_selling_products"),
+    pytest.param(
+        "Show me the total revenue by order status",
+        _STATUS_RE, None,
+        id="revenue_by_status"
+    ),
+    pytest.param("Which customer has placed the most orders?", None, (_tokens(r"customer"),), id="customer_most_orders"),
+
+    # Complex multi-table joins
+    pytest.param(
+        "Show me customer names with their total spending and number of orders",
+        None, (_JOIN_RE, _tokens(r"customers")),
+        marks=pytest.mark.smoke, id="customer_order_details"
+    ),
+    pytest.param(
+        "Which products have never been ordered?",
+        None, (_tokens(r"LEFT|NOT\s+EXISTS|NOT\s+IN"),),
+        id="product_order_relationship"
+    ),
+
+    # Subqueries
+    pytest.param(
+        "Show me customers who have placed orders with total amount above the average",
+        None, (_tokens(r"\("),),
+        marks=pytest.mark.smoke, id="subquery_in_where"
+    ),
+    pytest.param(
+        "Find products that are priced above the average price in their category",
+        None, (),
+        id="correlated_subquery"
+    ),
+    pytest.param(
+        "Show each customer with their total number of orders",
+        None, (_tokens(r"COUNT|GROUP\s+BY"),),
+        id="subquery_in_select"
+    ),
+
+    # NULL handling
+    pytest.param(
+        "Show me products without a description",
+        None, (_NULL_RE,),
+        marks=pytest.mark.smoke, id="null_filter"
+    ),
+    pytest.param(
+        "List all products with their descriptions, showing 'No description' if empty",
+        None, (_tokens(r"COALESCE|CASE|IS\s+NULL"),),
+        id="coalesce_usage"
+    ),
+
+    # Aggregations
+    pytest.param(
+        "Show me customers who have placed more than 5 orders",
+        None, (_GROUP_BY_RE, _tokens(r"HAVING|WHERE")),
+        marks=pytest.mark.smoke, id="having_clause"
+    ),
+
+    # Edge cases
+    pytest.param("Show me customers with first name 'ZZZNonexistent'", None, None, id="empty_result"),
+    pytest.param(
+        "Show me orders placed by customers whose last name starts with 'S' and have a total amount over 500",
+        None, (_tokens(r"WHERE"), _tokens(r"AND|OR")),
+        marks=pytest.mark.smoke, id="complex_filter"
+    ),
+
+    # Data types
+    pytest.param(
+        "Show me orders placed in the last 30 days",
+        None, (_DATE_RE,),
+        marks=pytest.mark.smoke, id="timestamp_handling"
+    ),
+    pytest.param(
+        "Find all customers whose email contains 'gmail'",
+        None, (_LIKE_RE,),
+        id="string_pattern_matching"
+    ),
+
+    # Sorting
+    pytest.param(
+        "Show me the 10 most expensive products",
+        None, (_ORDER_BY_RE, _tokens(r"DESC"), _tokens(r"LIMIT|TOP")),
+        marks=pytest.mark.smoke, id="order_by_desc"
+    ),
+]
+
+# Write statements the agent must refuse
+SECURITY_CASES = [
+    pytest.param(
+        "INSERT INTO customers (first_name, last_name, email) VALUES ('Test', 'User', 'test@test.com')",
+        id="insert"
+    ),
+    pytest.param("UPDATE customers SET email = 'new@email.com' WHERE customer_id = 1", id="update"),
+    pytest.param("DELETE FROM customers WHERE customer_id = 1", id="delete"),
+    pytest.param("DROP TABLE customers", id="drop"),
+]
+
+
+@pytest.mark.parametrize("prompt,content_pattern,sql_patterns", QUERY_CASES)
+def test_query(results, prompt, content_pattern, sql_patterns):
+    """Test that the agent answers with a query or info result matching the expected patterns"""
+    assert_query_ok(
+        results[prompt], *(sql_patterns or ()),
+        content_pattern=content_pattern, needs_details=sql_patterns is not None
+    )
+
+
+@pytest.mark.smoke
+@pytest.mark.parametrize("sql", SECURITY_CASES)
+def test_guard_rejects(sql):
+    """Test that the query guard rejects write statements"""
+    assert not is_select_only(sql)
+
+
+@pytest.mark.smoke
+@pytest.mark.parametrize("sql", ["SELECT 1", "  select * FROM customers"])
+def test_guard_accepts(sql):
+    """Test that the query guard accepts SELECT statements"""
+    assert is_select_only(sql)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("prompt", ["DROP TABLE customers"])
+def test_security_rejects(results, prompt):
+    """Test end to end that the agent refuses a write query"""
+    result = results[prompt]
+
+    assert result.data.type == "error"
+    assert _REJECTED_RE.search(result.data.content)
+
+
+@pytest.mark.parametrize("prompt", ["What is the average order value?"])
+def test_average_order_value(results, prompt):
+    """Test: What is the average order value?"""
+    result = results[prompt]
+
+    details = assert_query_ok(result)
+    if details is not None:
+        # Should contain AVG function
+        assert _AVG_RE.search(details) or _AVERAGE_RE.search(result.data.content)
+
+
+@pytest.mark.parametrize("prompt", ["Show me all customers who bought laptops"])
+def test_three_table_join(results, prompt):
+    """Test joining customers, orders, and products through order_items"""
+    details = assert_query_ok(results[prompt])
+    if details is not None:
+        # Should join multiple tables
+        assert at_least_n(_JOIN_RE, details, 2)  # At least 2 joins needed
+
+
+@pytest.mark.parametrize("prompt", ["Show me the min, max, and average product prices by category"])
+def test_multiple_aggregations(results, prompt):
+    """Test multiple aggregate functions in one query"""
+    details = assert_query_ok(results[prompt], _GROUP_BY_RE)
+    if details is not None:
+        # Should have multiple distinct aggregations
+        assert len({func.upper() for func in _AGG_RE.findall(details)}) >= 2
+
+
+@pytest.mark.parametrize("prompt", ["Show me products priced between 100 and 500"])
+def test_decimal_handling(results, prompt):
+    """Test queries with DECIMAL types (prices, amounts)"""
+    details = assert_query_ok(results[prompt])
+    if details is not None:
+        assert _BETWEEN_RE.search(details) or (">" in details and "<" in details)
+
+
+@pytest.mark.parametrize("prompt", ["List customers ordered by last name and then first name"])
+def test_multiple_order_columns(results, prompt):
+    """Test ordering by multiple columns"""
+    details = assert_query_ok(results[prompt])
+    if details is not None:
+        order_by = _ORDER_BY_RE.search(details)
+        assert order_by
+        # Should have comma in ORDER BY clause
+        assert details.find(",", order_by.end()) != -1
 
 
 if __name__ == "__main__":